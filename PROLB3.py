@@ -1,38 +1,150 @@
+import sys
 import time
+import queue
+import random
 import sqlite3
+import threading
+import weakref
 from collections import deque
-import numpy as np
+from itertools import chain
+from contextlib import contextmanager
+
+# Статуси завдань
+STATUS_PENDING = 'Очікує'
+STATUS_IN_PROGRESS = 'В процесі'
+STATUS_DONE = 'Виконано'
+STATUS_ERROR = 'Помилка'
+PENDING_STATUSES = (STATUS_PENDING, STATUS_IN_PROGRESS)
+
+class ConnectionPool:
+    """
+    Пул з'єднань SQLite, якими можуть користуватися різні потоки.
+    У режимі WAL читачі працюють паралельно між собою та з одним записувачем.
+    """
+
+    def __init__(self, db_name, size=4, timeout=5.0):
+        """
+        Відкриває size з'єднань з базою даних.
+        Для ':memory:' кожне з'єднання мало б власну окрему БД, тому пул містить одне з'єднання.
+
+        Args:
+            db_name (str): Ім'я файлу бази даних SQLite.
+            size (int): Кількість з'єднань у пулі.
+            timeout (float): Скільки секунд чекати на вільне з'єднання.
+        """
+        if db_name == ':memory:':
+            size = 1
+        self.db_name = db_name
+        self.timeout = timeout
+        self._pool = queue.Queue()
+        self._connections = []
+        for _ in range(size):
+            conn = self._open_connection()
+            self._connections.append(conn)
+            self._pool.put(conn)
+
+    def _open_connection(self):
+        """
+        Відкриває одне з'єднання з налаштованими PRAGMA.
+        З'єднання працює в режимі автокомміту (isolation_level=None), тому багатооператорні
+        транзакції відкриваються явно через BEGIN.
+        """
+        # cached_statements=128 — значення за замовчуванням, вказане явно; запитів у модулі
+        # значно менше, тож більший кеш нічого б не дав
+        conn = sqlite3.connect(self.db_name, isolation_level=None, cached_statements=128,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 МБ кешу сторінок
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    def get(self):
+        """
+        Бере вільне з'єднання з пулу (очікує не довше timeout секунд, якщо всі зайняті).
+
+        Raises:
+            sqlite3.OperationalError: Якщо за timeout не звільнилося жодне з'єднання.
+        """
+        try:
+            return self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("немає вільних з'єднань у пулі") from None
+
+    def put(self, conn):
+        """Повертає з'єднання до пулу."""
+        self._pool.put(conn)
+
+    @contextmanager
+    def acquire(self):
+        """Контекстний менеджер: видає з'єднання на час блоку with і повертає його до пулу."""
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.put(conn)
+
+    def close(self):
+        """Закриває всі з'єднання пулу."""
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
+
 
 # Определение класса DBManager ПЕРЕД TaskManager
 class DBManager:
-    def __init__(self, db_name='tasks.db'):
+    # Тексти запитів зберігаються в одному місці, щоб кожен виклик передавав той самий рядок SQL
+    # і потрапляв у стандартний кеш підготовлених операторів з'єднання (128 записів)
+    _INSERT_SQL = "INSERT INTO tasks (user, description, status) VALUES (?, ?, ?)"
+    _MULTI_INSERT_PREFIX = "INSERT INTO tasks (user, description, status) VALUES "
+    # Не більше 999 параметрів на оператор (ліміт старих збірок SQLite), по 3 на рядок
+    _MAX_ROWS_PER_INSERT = 999 // 3
+    _UPDATE_SQL = "UPDATE tasks SET status = ? WHERE id = ?"
+    _SELECT_ALL_SQL = "SELECT id, user, description, status, timestamp FROM tasks ORDER BY id"
+    _SELECT_TABLE_SQL = "SELECT id, user, status, description, timestamp FROM tasks ORDER BY id"
+    _SELECT_BY_ID_SQL = "SELECT id, user, description, status, timestamp FROM tasks WHERE id = ?"
+    _SELECT_REPORT_SQL = (
+        "SELECT id, user, description, status FROM tasks WHERE status IN (?, ?, ?, ?) "
+        "ORDER BY CASE status WHEN ? THEN 0 ELSE 1 END, id"
+    )
+    _SELECT_PENDING_SQL = "SELECT id, user, description FROM tasks WHERE status IN (?, ?) ORDER BY id"
+    _COUNT_BY_STATUS_SQL = "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+
+    def __init__(self, db_name='tasks.db', pool_size=4):
         """
         Ініціалізує менеджер бази даних.
         Підключається до вказаної бази даних SQLite та створює таблицю завдань, якщо вона не існує.
+        Запити виконуються через пул з'єднань; записи серіалізуються блокуванням,
+        а відкрита транзакція прив'язується до потоку, який її почав.
 
         Args:
             db_name (str): Ім'я файлу бази даних SQLite.
+            pool_size (int): Кількість з'єднань у пулі.
         """
         self.db_name = db_name
-        self.conn = None
-        self.cursor = None
-        self._connect()
+        self.pool = None
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._multi_insert_sql = {}
+        self._connect(pool_size)
         self._create_table()
 
-    def _connect(self):
-        """Встановлює з'єднання з базою даних."""
+    def _connect(self, pool_size):
+        """Створює пул з'єднань з базою даних."""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
+            self.pool = ConnectionPool(self.db_name, pool_size)
             print(f"Підключено до бази даних: {self.db_name}")
         except sqlite3.Error as e:
             print(f"Помилка підключення до бази даних: {e}")
             raise
 
     def _create_table(self):
-        """Створює таблицю 'tasks', якщо вона не існує."""
+        """Створює таблицю 'tasks' та індекс за статусом, якщо вони не існують."""
         try:
-            self.cursor.execute('''
+            with self._acquire() as conn, self._write_lock:
+                conn.execute('''
                 CREATE TABLE IF NOT EXISTS tasks (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user TEXT NOT NULL,
@@ -41,13 +153,26 @@ class DBManager:
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
-            self.conn.commit()
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)")
             print("Таблиця 'tasks' перевірена/створена.")
         except sqlite3.Error as e:
             print(f"Помилка створення таблиці: {e}")
             raise
 
-    def add_task(self, user_id, description, status='Очікує'):
+    @contextmanager
+    def _acquire(self):
+        """
+        Видає з'єднання для запиту: з'єднання відкритої транзакції поточного потоку,
+        якщо вона є, інакше вільне з'єднання з пулу.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+        else:
+            with self.pool.acquire() as conn:
+                yield conn
+
+    def add_task(self, user_id, description, status=STATUS_PENDING):
         """
         Додає нове завдання до бази даних.
 
@@ -55,56 +180,221 @@ class DBManager:
             int: ID новоствореного завдання.
         """
         try:
-            self.cursor.execute(
-                "INSERT INTO tasks (user, description, status) VALUES (?, ?, ?)",
-                (user_id, description, status)
-            )
-            self.conn.commit()
-            task_id = self.cursor.lastrowid
-            return task_id
+            with self._acquire() as conn, self._write_lock:
+                cursor = conn.execute(self._INSERT_SQL, (user_id, description, status))
+                return cursor.lastrowid
         except sqlite3.Error as e:
             print(f"Помилка додавання завдання: {e}")
             return None
 
-    def update_task_status(self, task_id, new_status):
+    def _get_multi_insert_sql(self, row_count):
+        """Повертає (і кешує) INSERT з row_count груп VALUES (?, ?, ?)."""
+        sql = self._multi_insert_sql.get(row_count)
+        if sql is None:
+            sql = self._MULTI_INSERT_PREFIX + ", ".join(["(?, ?, ?)"] * row_count)
+            self._multi_insert_sql[row_count] = sql
+        return sql
+
+    def add_tasks(self, rows):
+        """
+        Додає пакет завдань до бази даних однією транзакцією.
+        Рядки вставляються частинами до _MAX_ROWS_PER_INSERT штук одним багаторядковим INSERT.
+
+        Args:
+            rows (list): Список кортежів (user, description, status).
+
+        Returns:
+            int: ID першого доданого завдання (ID решти йдуть підряд) або None у разі помилки.
+        """
+        if not rows:
+            return None
+        try:
+            self.begin()
+            with self._acquire() as conn:
+                for start in range(0, len(rows), self._MAX_ROWS_PER_INSERT):
+                    chunk = rows[start:start + self._MAX_ROWS_PER_INSERT]
+                    conn.execute(self._get_multi_insert_sql(len(chunk)), tuple(chain.from_iterable(chunk)))
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            if not self.commit():
+                return None
+            return last_id - len(rows) + 1
+        except sqlite3.Error as e:
+            self.rollback()
+            print(f"Помилка пакетного додавання завдань: {e}")
+            return None
+
+    def begin(self):
+        """
+        Відкриває транзакцію запису (BEGIN IMMEDIATE) у поточному потоці.
+        До commit()/rollback() інші потоки не можуть писати в БД.
+        З'єднання береться з пулу до блокування запису, щоб очікування вільного
+        з'єднання не затримувало інших записувачів.
+        """
+        conn = self.pool.get()
+        self._write_lock.acquire()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error:
+            self._write_lock.release()
+            self.pool.put(conn)
+            raise
+        self._local.conn = conn
+
+    def commit(self):
+        """
+        Фіксує транзакцію поточного потоку; у разі помилки відкочує її.
+
+        Returns:
+            bool: True, якщо транзакцію зафіксовано.
+        """
+        conn = self._local.conn
+        try:
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Помилка фіксації транзакції: {e}")
+            conn.rollback()
+            return False
+        finally:
+            self._end_transaction(conn)
+
+    def rollback(self):
+        """Відкочує транзакцію поточного потоку, якщо вона відкрита."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            self._end_transaction(conn)
+
+    def _end_transaction(self, conn):
+        """Повертає з'єднання транзакції до пулу та знімає блокування запису."""
+        self._local.conn = None
+        self._write_lock.release()
+        self.pool.put(conn)
+
+    def _update_task_status_nocommit(self, task_id, new_status):
         """
         Оновлює статус завдання за його ID.
+        Не фіксує зміни: всередині begin()/commit() зміна лише додається до транзакції.
         """
         try:
-            self.cursor.execute(
-                "UPDATE tasks SET status = ? WHERE id = ?",
-                (new_status, task_id)
-            )
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            with self._acquire() as conn, self._write_lock:
+                cursor = conn.execute(self._UPDATE_SQL, (new_status, task_id))
+                return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"Помилка оновлення статусу завдання {task_id}: {e}")
             return False
 
+    def update_task_status(self, task_id, new_status):
+        """
+        Оновлює статус завдання за його ID окремою транзакцією.
+
+        Returns:
+            bool: True, якщо завдання знайдено та оновлено.
+        """
+        try:
+            self.begin()
+        except sqlite3.Error as e:
+            print(f"Помилка оновлення статусу завдання {task_id}: {e}")
+            return False
+        if not self._update_task_status_nocommit(task_id, new_status):
+            self.rollback()
+            return False
+        return self.commit()
+
     def get_all_tasks(self):
         """
         Отримує всі завдання з бази даних.
+        Рядки зчитуються повністю, щоб з'єднання одразу повернулося до пулу.
+
+        Returns:
+            list[sqlite3.Row]: Рядки завдань (доступ до полів за назвою, напр. row['status']).
+        """
+        try:
+            with self._acquire() as conn:
+                return conn.execute(self._SELECT_ALL_SQL).fetchall()
+        except sqlite3.Error as e:
+            print(f"Помилка отримання всіх завдань: {e}")
+            return []
+
+    def get_all_task_tuples(self):
+        """
+        Отримує всі завдання як звичайні кортежі (id, user, status, description, timestamp)
+        у порядку стовпців таблиці статусів, без обгортки sqlite3.Row.
 
         Returns:
-            list: Список словників, кожен з яких представляє завдання.
+            list[tuple]: Кортежі завдань.
         """
         try:
-            self.cursor.execute("SELECT id, user, description, status, timestamp FROM tasks ORDER BY id")
-            rows = self.cursor.fetchall()
-            tasks = []
-            for row in rows:
-                tasks.append({
-                    'id': row[0],
-                    'user': row[1],
-                    'description': row[2],
-                    'status': row[3],
-                    'timestamp': row[4]
-                })
-            return tasks
+            with self._acquire() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                return cursor.execute(self._SELECT_TABLE_SQL).fetchall()
         except sqlite3.Error as e:
             print(f"Помилка отримання всіх завдань: {e}")
             return []
 
+    def get_pending_tasks(self):
+        """
+        Отримує незавершені завдання (статус 'Очікує' або 'В процесі') лише з полями,
+        потрібними черзі.
+
+        Returns:
+            list[tuple]: Кортежі (id, user, description), впорядковані за ID.
+        """
+        try:
+            with self._acquire() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                return cursor.execute(self._SELECT_PENDING_SQL, PENDING_STATUSES).fetchall()
+        except sqlite3.Error as e:
+            print(f"Помилка отримання незавершених завдань: {e}")
+            return []
+
+    def count_by_status(self):
+        """
+        Підраховує кількість завдань для кожного статусу засобами SQL.
+
+        Returns:
+            dict: Словник {статус: кількість завдань}.
+        """
+        try:
+            with self._acquire() as conn:
+                return dict(conn.execute(self._COUNT_BY_STATUS_SQL).fetchall())
+        except sqlite3.Error as e:
+            print(f"Помилка підрахунку завдань за статусами: {e}")
+            return {}
+
+    def get_report_snapshot(self):
+        """
+        Отримує дані для звіту з одного знімка БД: лічильники за статусами та рядки завдань
+        (спочатку виконані, потім усі інші, в межах кожної групи — за ID).
+        Обидва запити виконуються на одному з'єднанні в одній транзакції читання,
+        тому паралельні записи між ними не можуть розсинхронізувати підсумки й рядки.
+
+        Returns:
+            tuple: (dict {статус: кількість}, list[sqlite3.Row] з полями id, user, description, status).
+        """
+        params = (STATUS_DONE, STATUS_ERROR) + PENDING_STATUSES + (STATUS_DONE,)
+        try:
+            with self._acquire() as conn:
+                own_transaction = not conn.in_transaction
+                if own_transaction:
+                    conn.execute("BEGIN")
+                try:
+                    counts = dict(conn.execute(self._COUNT_BY_STATUS_SQL).fetchall())
+                    rows = conn.execute(self._SELECT_REPORT_SQL, params).fetchall()
+                finally:
+                    if own_transaction:
+                        conn.commit()
+                return counts, rows
+        except sqlite3.Error as e:
+            print(f"Помилка отримання даних для звіту: {e}")
+            return {}, []
+
     def get_task_by_id(self, task_id):
         """
         Отримує завдання за його ID.
@@ -113,37 +403,61 @@ class DBManager:
             dict: Словник з інформацією про завдання або None, якщо не знайдено.
         """
         try:
-            self.cursor.execute("SELECT id, user, description, status, timestamp FROM tasks WHERE id = ?", (task_id,))
-            row = self.cursor.fetchone()
-            if row:
-                return {
-                    'id': row[0],
-                    'user': row[1],
-                    'description': row[2],
-                    'status': row[3],
-                    'timestamp': row[4]
-                }
-            return None
+            with self._acquire() as conn:
+                row = conn.execute(self._SELECT_BY_ID_SQL, (task_id,)).fetchone()
+            return dict(row) if row else None
         except sqlite3.Error as e:
             print(f"Помилка отримання завдання {task_id}: {e}")
             return None
 
+    def __enter__(self):
+        """Повертає менеджер бази даних для використання в блоці with."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Закриває з'єднання з базою даних при виході з блоку with."""
+        self.close()
+
     def close(self):
-        """Закриває з'єднання з базою даних."""
-        if self.conn:
-            self.conn.close()
+        """Закриває всі з'єднання з базою даних."""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
             print(f"З'єднання з базою даних {self.db_name} закрито.")
 
 
 # Определение класса TaskManager
 class TaskManager:
-    def __init__(self, db_name='tasks.db'):
+    # Шаблон рядка таблиці статусів: ID | Користувач | Статус | Опис | Час створення
+    _TASK_ROW_FMT = "%-5s | %-15s | %-10s | %-30s | %-20s"
+
+    def __init__(self, db_name='tasks.db', flush_threshold=1000, verbose=False, pool_size=4,
+                 persist_intermediate=False):
         """
         Ініціалізує менеджер завдань.
-        Містить чергу завдань (queue) та використовує DBManager для взаємодії з базою даних.
+        Містить чергу завдань (queue) з кортежів (id, user, description)
+        та використовує DBManager для взаємодії з базою даних.
+        Нові завдання буферизуються і записуються в БД пакетами по flush_threshold штук
+        (або раніше, перед обробкою черги чи читанням з БД). Використовуйте менеджер у блоці
+        with або викликайте close(): так буфер гарантовано записується. Якщо цього не зробити,
+        залишок буфера записується під час збирання об'єкта або завершення інтерпретатора.
+        Повідомлення про кожне завдання та вміст черги виводяться лише при verbose=True.
+        pool_size задає кількість з'єднань з БД, спільних для робочих потоків.
+        persist_intermediate визначає, чи записується в БД проміжний статус 'В процесі'
+        при послідовній обробці (робочі потоки run_workers записують його завжди).
         """
-        self.db_manager = DBManager(db_name) # Теперь DBManager доступен
+        self.db_manager = DBManager(db_name, pool_size) # Теперь DBManager доступен
         self.task_queue = deque()
+        self.flush_threshold = flush_threshold
+        self.verbose = verbose
+        self._persist_intermediate = persist_intermediate
+        self._pending_rows = []
+        self._buffer_lock = threading.Lock()
+        self._output_lock = threading.Lock()
+        # Страховка на випадок, коли close() не викликано: не залежить від __del__
+        # і спрацьовує також при завершенні інтерпретатора
+        self._finalizer = weakref.finalize(
+            self, TaskManager._flush_and_close, self.db_manager, self._pending_rows)
         self._load_pending_tasks_to_queue()
         print("\n--- Симуляція багатокористувацької системи з чергою завдань (з SQLite) ---")
 
@@ -151,156 +465,274 @@ class TaskManager:
         """
         Завантажує завдання зі статусом 'Очікує' або 'В процесі' з БД у чергу.
         """
-        all_db_tasks = self.db_manager.get_all_tasks()
-        for task in all_db_tasks:
-            if task['status'] == 'Очікує' or task['status'] == 'В процесі':
-                self.task_queue.append(task['id'])
+        self.task_queue.extend(self.db_manager.get_pending_tasks())
         print(f"Завантажено {len(self.task_queue)} завдань у чергу з БД.")
         self.display_queue_status()
 
     def add_task(self, user_id, task_description):
         """
-        Додає нове завдання до бази даних та до черги.
+        Додає нове завдання до буфера; буфер записується в БД та в чергу при заповненні,
+        перед обробкою черги або в close().
         """
-        task_id = self.db_manager.add_task(user_id, task_description, 'Очікує')
-        if task_id is not None:
-            self.task_queue.append(task_id)
-            print(f"[{user_id}] Додано завдання: ID {task_id} - '{task_description}'")
-        self.display_queue_status()
+        with self._buffer_lock:
+            self._pending_rows.append((user_id, task_description, STATUS_PENDING))
+            buffer_full = len(self._pending_rows) >= self.flush_threshold
+        if buffer_full:
+            self.flush_pending_tasks()
 
-    def process_next_task(self):
+    def flush_pending_tasks(self):
+        """
+        Записує буферизовані завдання до бази даних однією транзакцією та додає їх до черги.
+        """
+        with self._buffer_lock:
+            if not self._pending_rows:
+                return
+            # Список очищується на місці: на нього посилається фіналізатор
+            rows = self._pending_rows[:]
+            self._pending_rows.clear()
+            first_id = self.db_manager.add_tasks(rows)
+            if first_id is not None:
+                for task_id, (user_id, task_description, _) in enumerate(rows, first_id):
+                    self.task_queue.append((task_id, user_id, task_description))
+                    if self.verbose:
+                        self._write(f"[{user_id}] Додано завдання: ID {task_id} - '{task_description}'\n")
+        if self.verbose:
+            self.display_queue_status()
+
+    def process_next_task(self, persist_intermediate=None):
         """
         Обробляє наступне завдання з черги.
+        Безпечно викликається з кількох потоків одночасно.
+
+        Args:
+            persist_intermediate (bool): Чи записувати проміжний статус 'В процесі';
+                None — використати налаштування менеджера.
         """
-        if not self.task_queue:
+        if persist_intermediate is None:
+            persist_intermediate = self._persist_intermediate
+
+        self.flush_pending_tasks()
+        task = self._pop_next_task()
+        if task is None:
             print("Черга завдань порожня. Немає завдань для обробки.")
             return False
+        return self._process_task(task, persist_intermediate)
 
-        task_id = self.task_queue.popleft()
-        task_info = self.db_manager.get_task_by_id(task_id)
+    def _pop_next_task(self):
+        """
+        Атомарно забирає наступне завдання з черги.
+
+        Returns:
+            tuple: Кортеж (id, user, description) або None, якщо черга порожня.
+        """
+        try:
+            return self.task_queue.popleft()
+        except IndexError:
+            return None
 
-        if task_info:
-            self.db_manager.update_task_status(task_id, 'В процесі')
-            print(
-                f"\n[Система] Обробка завдання: ID {task_id} від користувача '{task_info['user']}' - '{task_info['description']}'")
-            time.sleep(1)
+    def _process_task(self, task, persist_intermediate, show_queue=True):
+        """
+        Обробляє одне вже вилучене з черги завдання та записує його статус у БД.
+        show_queue визначає, чи виводити стан черги після завдання в режимі verbose.
+        """
+        # Черга вже містить дані завдання, тому повторно читати його з БД не потрібно
+        task_id, user_id, description = task
+
+        # Кожне оновлення статусу фіксується окремо, щоб імітація роботи (sleep)
+        # не утримувала блокування запису і потоки могли працювати паралельно.
+        # Проміжний статус потрібен лише тоді, коли його можуть побачити інші читачі.
+        if persist_intermediate and not self.db_manager.update_task_status(task_id, STATUS_IN_PROGRESS):
+            self._write(f"[Система] Помилка: не вдалося оновити статус завдання ID {task_id} (не знайдено в БД або БД недоступна).\n")
+            return False
 
-            if np.random.rand() < 0.8:
-                new_status = 'Виконано'
-            else:
-                new_status = 'Помилка'
+        if self.verbose:
+            self._write(f"\n[Система] Обробка завдання: ID {task_id} від користувача '{user_id}' - '{description}'\n")
+        time.sleep(1)
 
-            self.db_manager.update_task_status(task_id, new_status)
-            print(f"[Система] Завдання ID {task_id} - '{task_info['description']}' - Статус: {new_status}.")
+        if random.random() < 0.8:
+            new_status = STATUS_DONE
         else:
-            print(f"[Система] Помилка: Завдання ID {task_id} не знайдено в базі даних.")
-            return False
+            new_status = STATUS_ERROR
 
-        self.display_queue_status()
+        if not self.db_manager.update_task_status(task_id, new_status):
+            self._write(f"[Система] Помилка: не вдалося оновити статус завдання ID {task_id} (не знайдено в БД або БД недоступна).\n")
+            return False
+        if self.verbose:
+            message = f"[Система] Завдання ID {task_id} - '{description}' - Статус: {new_status}.\n"
+            if show_queue:
+                message += self._queue_status_line()
+            self._write(message)
         return True
 
+    def run_workers(self, num_workers=4):
+        """
+        Обробляє чергу паралельно в num_workers потоках і чекає, доки вона спорожніє.
+        """
+        self.flush_pending_tasks()
+        workers = [
+            threading.Thread(target=self._worker_loop, name=f"worker-{i}")
+            for i in range(num_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if self.verbose:
+            self.display_queue_status()
+
+    def _worker_loop(self):
+        """Цикл робочого потоку: обробляє завдання, поки черга не спорожніє."""
+        while True:
+            task = self._pop_next_task()
+            if task is None:
+                return
+            try:
+                # Стан черги між завданнями паралельних потоків не інформативний,
+                # run_workers виводить його один раз після завершення
+                self._process_task(task, persist_intermediate=True, show_queue=False)
+            except Exception as e:
+                # Помилка одного завдання не повинна зупиняти робочий потік
+                self._write(f"[Система] Помилка робочого потоку {threading.current_thread().name}: {e}\n")
+
+    def _write(self, text):
+        """
+        Виводить текст одним записом у stdout під блокуванням,
+        щоб повідомлення паралельних потоків не перемішувалися.
+        """
+        with self._output_lock:
+            sys.stdout.write(text)
+
+    def _queue_status_line(self):
+        """Формує рядок стану черги: ID завдань у режимі verbose, інакше лише довжину."""
+        if self.verbose:
+            return f"Поточний стан черги (ID): {[task[0] for task in list(self.task_queue)]}\n"
+        return f"Поточний стан черги: len={len(self.task_queue)}\n"
+
     def display_queue_status(self):
         """
-        Відображає поточний стан черги (ID завдань).
+        Відображає поточний стан черги: ID завдань у режимі verbose, інакше лише довжину.
         """
-        print(f"Поточний стан черги (ID): {list(self.task_queue)}")
+        self._write(self._queue_status_line())
 
     def display_all_tasks_status(self):
         """
         Відображає статус всіх завдань, зчитаних з бази даних.
         """
+        self.flush_pending_tasks()
         print("\n--- Загальний статус всіх завдань (з БД) ---")
-        all_tasks = self.db_manager.get_all_tasks()
-        if not all_tasks:
+        # Рядки форматуються з кортежів одним шаблоном і виводяться одним записом
+        fmt = self._TASK_ROW_FMT
+        body = "\n".join(fmt % row for row in self.db_manager.get_all_task_tuples())
+        if not body:
             print("Немає завдань у базі даних.")
             return
 
-        print(f"{'ID':<5} | {'Користувач':<15} | {'Статус':<10} | {'Опис':<30} | {'Час створення':<20}")
-        print("-" * 90)
-        for task in all_tasks:
-            print(
-                f"{task['id']:<5} | {task['user']:<15} | {task['status']:<10} | {task['description']:<30} | {task['timestamp']:<20}")
-        print("-" * 90)
+        separator = "-" * 90
+        header = fmt % ('ID', 'Користувач', 'Статус', 'Опис', 'Час створення')
+        sys.stdout.write("\n".join((header, separator, body, separator)) + "\n")
 
     def generate_report(self):
         """
         Генерує звіт про оброблені та необроблені завдання, зчитані з бази даних.
         """
-        print("\n--- Звіт про обробку завдань (з БД) ---")
-        all_tasks = self.db_manager.get_all_tasks()
-
-        processed_count = 0
-        unprocessed_count = 0
-        processed_list = []
-        unprocessed_list = []
-
-        for task in all_tasks:
-            if task['status'] == 'Виконано':
-                processed_count += 1
-                processed_list.append(task)
-            elif task['status'] == 'Помилка':
-                unprocessed_count += 1
-                unprocessed_list.append(task)
-            # Также можно добавить 'Очікує' и 'В процесі' как необработанные, если они не были завершены
-            elif task['status'] == 'Очікує' or task['status'] == 'В процесі':
-                unprocessed_count += 1
-                unprocessed_list.append(task)
-
-
-        print(f"Всього зареєстровано завдань у БД: {len(all_tasks)}")
-        print(f"Кількість успішно оброблених завдань: {processed_count}")
-        print(f"Кількість завдань, що завершилися з помилкою або знаходяться в черзі: {unprocessed_count}")
-
-        if processed_list:
-            print("\nУспішно оброблені завдання:")
-            for task in processed_list:
-                print(f"- ID {task['id']} (Користувач: {task['user']}, Опис: '{task['description']}')")
-        else:
-            print("\nНемає успішно оброблених завдань.")
+        self.flush_pending_tasks()
+        # Рядки звіту виводяться потоково, без проміжних списків завдань
+        sys.stdout.writelines(self._report_lines())
 
-        if unprocessed_list:
-            print("\nНеоброблені (з помилкою або в черзі) завдання:")
-            for task in unprocessed_list:
-                print(f"- ID {task['id']} (Користувач: {task['user']}, Опис: '{task['description']}', Статус: {task['status']})")
-        else:
-            print("\nНемає завдань, що завершилися з помилкой або знаходяться в черзі.")
+    def _report_lines(self):
+        """
+        Генерує рядки звіту. Завдання впорядковані так, що виконані йдуть першими,
+        тому розділ необроблених завдань починається на першому рядку з іншим статусом.
+        """
+        yield "\n--- Звіт про обробку завдань (з БД) ---\n"
+        # Підрахунок за статусами виконується в SQLite, а не в циклі Python;
+        # підсумки та рядки беруться з одного знімка БД
+        counts, rows = self.db_manager.get_report_snapshot()
+        total_count = sum(counts.values())
+        processed_count = counts.get(STATUS_DONE, 0)
+        unprocessed_count = sum(counts.get(status, 0) for status in (STATUS_ERROR,) + PENDING_STATUSES)
+
+        yield f"Всього зареєстровано завдань у БД: {total_count}\n"
+        yield f"Кількість успішно оброблених завдань: {processed_count}\n"
+        yield f"Кількість завдань, що завершилися з помилкою або знаходяться в черзі: {unprocessed_count}\n"
+
+        # Заголовки розділів визначаються самими рядками, а не лічильниками вище
+        in_done_section = False
+        in_unprocessed_section = False
+        for task in rows:
+            if task['status'] == STATUS_DONE:
+                if not in_done_section:
+                    in_done_section = True
+                    yield "\nУспішно оброблені завдання:\n"
+                yield f"- ID {task['id']} (Користувач: {task['user']}, Опис: '{task['description']}')\n"
+                continue
+            if not in_unprocessed_section:
+                if not in_done_section:
+                    yield "\nНемає успішно оброблених завдань.\n"
+                    in_done_section = True
+                in_unprocessed_section = True
+                yield "\nНеоброблені (з помилкою або в черзі) завдання:\n"
+            yield f"- ID {task['id']} (Користувач: {task['user']}, Опис: '{task['description']}', Статус: {task['status']})\n"
+
+        if not in_done_section:
+            yield "\nНемає успішно оброблених завдань.\n"
+        if not in_unprocessed_section:
+            yield "\nНемає завдань, що завершилися з помилкой або знаходяться в черзі.\n"
 
 
-    def __del__(self):
+    def close(self):
+        """
+        Записує буферизовані завдання та закриває з'єднання з базою даних.
+        """
+        if self._finalizer.alive:
+            self.flush_pending_tasks()
+            self._finalizer()
+
+    @staticmethod
+    def _flush_and_close(db_manager, pending_rows):
         """
-        Деструктор: гарантує закриття з'єднання з базою даних при завершенні роботи об'єкта.
+        Записує залишок буфера та закриває БД; викликається рівно один раз —
+        з close() або як фіналізатор, якщо менеджер не закрили явно.
         """
-        if hasattr(self, 'db_manager') and self.db_manager is not None:
-            self.db_manager.close()
+        if pending_rows:
+            db_manager.add_tasks(list(pending_rows))
+            pending_rows.clear()
+        db_manager.close()
+
+    def __enter__(self):
+        """Повертає менеджер завдань для використання в блоці with."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Записує буферизовані завдання та закриває БД при виході з блоку with."""
+        self.close()
 
 
 if __name__ == "__main__":
     # Запустіть цей файл, і він створить/використає tasks.db
-    manager = TaskManager('tasks.db')
+    with TaskManager('tasks.db', verbose=True) as manager:
 
-    manager.add_task("UserA", "Надіслати звіт до 17:00")
-    manager.add_task("UserB", "Створити новий проект")
-    manager.add_task("UserC", "Відповісти на email")
-    manager.add_task("UserA", "Забронювати переговорну")
-    manager.add_task("UserB", "Підготувати презентацію")
+        manager.add_task("UserA", "Надіслати звіт до 17:00")
+        manager.add_task("UserB", "Створити новий проект")
+        manager.add_task("UserC", "Відповісти на email")
+        manager.add_task("UserA", "Забронювати переговорну")
+        manager.add_task("UserB", "Підготувати презентацію")
+        manager.flush_pending_tasks()
 
-    print("\n--- Початок обробки завдань ---")
+        print("\n--- Початок обробки завдань ---")
 
-    for _ in range(4):
-        if not manager.process_next_task():
-            break
-        time.sleep(0.5)
+        for _ in range(4):
+            if not manager.process_next_task():
+                break
+            time.sleep(0.5)
 
-    manager.add_task("UserD", "Перевірити базу даних")
-    manager.add_task("UserC", "Оновити програмне забезпечення")
+        manager.add_task("UserD", "Перевірити базу даних")
+        manager.add_task("UserC", "Оновити програмне забезпечення")
 
-    while manager.task_queue:
-        if not manager.process_next_task():
-            break
-        time.sleep(0.5)
+        manager.run_workers(num_workers=3)
 
-    print("\n--- Обробка завдань завершена ---")
+        print("\n--- Обробка завдань завершена ---")
 
-    manager.display_all_tasks_status()
+        manager.display_all_tasks_status()
 
-    manager.generate_report()
\ No newline at end of file
+        manager.generate_report()
\ No newline at end of file